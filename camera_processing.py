@@ -1,22 +1,33 @@
 import cv2
 import asyncio
 import threading
+import math
 from queue import Queue
 from object_detection import detect_objects
-from motion_detection import detect_motion
+from motion_detection import MotionDetector
 from collections import deque
+from scene_logic import (
+    MOTION_THRESHOLD, MIN_CONTOUR_AREA, PERSON_CONFIDENCE, DETECTION_BUFFER_SIZE,
+    MOTION_BUFFER_RATIO, PERSON_BUFFER_RATIO, SCENE_CHANGE_COOLDOWN, PROCESS_INTERVAL,
+    get_camera_url, get_detection_rate, get_processing_scale, prepare_detection_frame,
+    required_detections, buffer_ratio_met, condition_set_met,
+)
 
 # Buffers to smooth out detections
 detection_buffer = {}
 last_scene_change_time = 0
-SCENE_CHANGE_COOLDOWN = 1  # 1 second cooldown
 
 # Queues for each camera
 frame_queues = {}
 
-# Motion detection thresholds
-MOTION_THRESHOLD = 10000  # Adjust this value based on testing
-MIN_CONTOUR_AREA = 100  # Adjust this value based on testing
+# One motion detector per camera, so background models and optical flow never mix feeds
+motion_detectors = {}
+
+# Latest detection time and results per camera. Cameras with a detection_rate
+# reuse their last results between detections instead of dropping out of the
+# evaluation, which would make every condition on them fail.
+last_detection_times = {}
+last_detection_results = {}
 
 def capture_frames(camera_name, url, queue):
     cap = cv2.VideoCapture(url)
@@ -33,14 +44,6 @@ def capture_frames(camera_name, url, queue):
             print(f"[WARNING] Failed to capture frame from camera: {camera_name}")
         cv2.waitKey(10)  # Small delay to reduce CPU usage
 
-def apply_detection_boundaries(frame, boundaries):
-    height, width = frame.shape[:2]
-    left = int(boundaries['left'] * width / 100)
-    top = int(boundaries['top'] * height / 100)
-    right = int(boundaries['right'] * width / 100)
-    bottom = int(boundaries['bottom'] * height / 100)
-    return frame[top:bottom, left:right]
-
 async def process_camera_feeds(obs, config):
     global detection_buffer
     
@@ -49,18 +52,16 @@ async def process_camera_feeds(obs, config):
         return
 
     # Initialize detection buffers based on the logic conditions
-    for condition_set in config['logic_conditions']:
-        for condition in condition_set['conditions']:
-            camera = condition['camera']
-            detection_type = condition['detection_type']
-            if camera not in detection_buffer:
-                detection_buffer[camera] = {}
-            if detection_type not in detection_buffer[camera]:
-                detection_buffer[camera][detection_type] = deque(maxlen=10)
+    for camera, detection_type in required_detections(config):
+        if camera not in detection_buffer:
+            detection_buffer[camera] = {}
+        detection_buffer[camera][detection_type] = deque(maxlen=DETECTION_BUFFER_SIZE)
+        if detection_type == 'motion':
+            motion_detectors[camera] = MotionDetector()
 
     # Start capture threads
     for name, camera_info in config['cameras'].items():
-        url = camera_info['url'] if isinstance(camera_info, dict) else camera_info
+        url = get_camera_url(camera_info)
         frame_queues[name] = Queue(maxsize=1)
         threading.Thread(target=capture_frames, args=(name, url, frame_queues[name]), daemon=True).start()
 
@@ -74,7 +75,7 @@ async def process_camera_feeds(obs, config):
             if frames:
                 await evaluate_conditions(obs, config, frames)
 
-            await asyncio.sleep(0.1)  # Check every 100ms
+            await asyncio.sleep(PROCESS_INTERVAL)
     except asyncio.CancelledError:
         print("[DEBUG] Camera processing was cancelled.")
     finally:
@@ -84,10 +85,10 @@ def update_detection_buffer(camera, detection_type, result):
     detection_buffer[camera][detection_type].append(result)
     if detection_type == 'motion':
         # For motion, require more consistent detection
-        return sum(detection_buffer[camera][detection_type]) / len(detection_buffer[camera][detection_type]) > 0.5
+        return buffer_ratio_met(detection_buffer[camera][detection_type], MOTION_BUFFER_RATIO)
     else:
         # For person detection, keep it more responsive
-        return sum(detection_buffer[camera][detection_type]) / len(detection_buffer[camera][detection_type]) > 0.5
+        return buffer_ratio_met(detection_buffer[camera][detection_type], PERSON_BUFFER_RATIO)
 
 async def evaluate_conditions(obs, config, frames):
     global last_scene_change_time
@@ -104,55 +105,42 @@ async def evaluate_conditions(obs, config, frames):
 
     # Perform detections once for each camera
     detection_results = {}
+    detections = required_detections(config)
     for camera, frame in frames.items():
-        try:
-            camera_info = config['cameras'][camera]
-            boundaries = camera_info.get('detection_boundaries') if isinstance(camera_info, dict) else None
+        detection_rate = get_detection_rate(config['cameras'][camera])
+        if detection_rate and current_time - last_detection_times.get(camera, -math.inf) < 1 / detection_rate:
+            detection_results.update(last_detection_results.get(camera, {}))
+            continue
 
-            if boundaries:
-                frame = apply_detection_boundaries(frame, boundaries)
+        camera_results = {}
+        try:
+            scale = get_processing_scale(frame, config['cameras'][camera])
+            frame = prepare_detection_frame(frame, config['cameras'][camera])
 
             # Perform detections based on the conditions for this camera
-            for condition_set in config['logic_conditions']:
-                for condition in condition_set['conditions']:
-                    if condition['camera'] == camera:
-                        if condition['detection_type'] == 'person':
-                            person_detected = 'person' in detect_objects(frame, confidence_threshold=0.6)
-                            detection_results[f"{camera}_person"] = update_detection_buffer(camera, 'person', person_detected)
-                            print(f"[DEBUG] Person detection for {camera}: {detection_results[f'{camera}_person']}")
-                        elif condition['detection_type'] == 'motion':
-                            motion_detected, motion_score, contours_count = detect_motion(frame, threshold=MOTION_THRESHOLD, min_area=MIN_CONTOUR_AREA)
-                            detection_results[f"{camera}_motion"] = update_detection_buffer(camera, 'motion', motion_detected)
-                            print(f"[DEBUG] Motion detection for {camera} - Motion detected: {motion_detected}, Score: {motion_score}, Contours: {contours_count}")
+            for detection_camera, detection_type in detections:
+                if detection_camera != camera:
+                    continue
+                if detection_type == 'person':
+                    person_detected = 'person' in detect_objects(frame, confidence_threshold=PERSON_CONFIDENCE)
+                    camera_results[f"{camera}_person"] = update_detection_buffer(camera, 'person', person_detected)
+                    print(f"[DEBUG] Person detection for {camera}: {camera_results[f'{camera}_person']}")
+                elif detection_type == 'motion':
+                    motion_detected, motion_score, contours_count = motion_detectors[camera].detect_motion(frame, threshold=MOTION_THRESHOLD, min_area=MIN_CONTOUR_AREA, scale=scale)
+                    camera_results[f"{camera}_motion"] = update_detection_buffer(camera, 'motion', motion_detected)
+                    print(f"[DEBUG] Motion detection for {camera} - Motion detected: {motion_detected}, Score: {motion_score}, Contours: {contours_count}")
         except Exception as e:
             print(f"[ERROR] Error in detection for camera {camera}: {str(e)}")
-            detection_results[f"{camera}_person"] = False
-            detection_results[f"{camera}_motion"] = False
+            camera_results[f"{camera}_person"] = False
+            camera_results[f"{camera}_motion"] = False
+
+        detection_results.update(camera_results)
+        last_detection_results[camera] = camera_results
+        last_detection_times[camera] = current_time
 
     for i, condition_set in enumerate(config['logic_conditions'], 1):
         print(f"\n[{timestamp:.3f}] [DEBUG] Evaluating Condition Set {i}:")
-        all_conditions_met = True
-
-        for condition in condition_set['conditions']:
-            camera = condition['camera']
-            detection_type = condition['detection_type']
-            condition_type = condition['condition_type']
-
-            if camera not in frames:
-                all_conditions_met = False
-                break
-
-            detection_key = f"{camera}_{detection_type}"
-            detection_result = detection_results.get(detection_key, False)
-
-            condition_met = (
-                (condition_type == 'presence' and detection_result) or
-                (condition_type == 'absence' and not detection_result)
-            )
-
-            if not condition_met:
-                all_conditions_met = False
-                break
+        all_conditions_met = condition_set_met(condition_set, frames, detection_results)
 
         print(f"[{timestamp:.3f}] [DEBUG] All conditions in set {i} met: {all_conditions_met}")
         if all_conditions_met:
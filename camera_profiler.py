@@ -0,0 +1,261 @@
+import asyncio
+import math
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from motion_detection import MotionDetector
+from scene_logic import (
+    MOTION_THRESHOLD, MIN_CONTOUR_AREA, PERSON_CONFIDENCE, PROCESS_INTERVAL,
+    get_camera_url, get_processing_scale, prepare_detection_frame, required_detections,
+)
+
+PROBE_DURATION = 5  # Seconds of stream to measure per camera
+PROBE_TIMEOUT = 10
+READ_CHUNK_SIZE = 16384
+SAMPLE_FRAMES = 5  # Frames kept per camera to time the detection stages
+
+# Processing widths tried from the camera's native width downwards
+CANDIDATE_WIDTHS = [1920, 1280, 960, 640, 480, 320]
+
+# Share of the processing loop the detections of all profiled cameras together may use
+CPU_BUDGET = 0.8
+# Lowest detection rate worth keeping a higher processing resolution for
+TARGET_DETECTION_RATE = 5
+
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+HEADER_END = b'\r\n\r\n'
+
+class StreamStats:
+    def __init__(self):
+        self.start = time.monotonic()
+        self.connect_latency = None
+        self.arrivals = []
+        self.jpeg_sizes = []
+        self.decode_times = []
+        self.samples = []
+        self.last_sample_time = None
+        self.resolution = None
+
+    def add_frame(self, frame, arrival, jpeg_size, decode_time):
+        # arrival is when the frame's last bytes were received, taken before decoding
+        self.arrivals.append(arrival)
+        self.jpeg_sizes.append(jpeg_size)
+        self.decode_times.append(decode_time)
+        if frame is None:
+            return
+        self.resolution = (frame.shape[1], frame.shape[0])
+        # Keep samples spaced like the live loop would see them
+        if len(self.samples) < SAMPLE_FRAMES and (not self.samples or arrival - self.last_sample_time >= PROCESS_INTERVAL):
+            self.samples.append(frame)
+            self.last_sample_time = arrival
+
+    def done(self):
+        return time.monotonic() - self.start >= PROBE_DURATION
+
+    def result(self):
+        if len(self.arrivals) < 2 or len(self.samples) < 2 or self.arrivals[-1] == self.arrivals[0]:
+            raise RuntimeError(f"only {len(self.arrivals)} frames received in {PROBE_DURATION} seconds")
+
+        intervals = [later - earlier for earlier, later in zip(self.arrivals, self.arrivals[1:])]
+        return {
+            "fps": (len(self.arrivals) - 1) / (self.arrivals[-1] - self.arrivals[0]),
+            "resolution": self.resolution,
+            "jpeg_size": statistics.mean(self.jpeg_sizes),
+            "decode_time": statistics.mean(self.decode_times),
+            "connect_latency": self.connect_latency,
+            "first_frame_latency": self.arrivals[0] - self.start,
+            "jitter": statistics.pstdev(intervals),
+            "samples": self.samples
+        }
+
+def _content_length(headers):
+    for line in headers.split(b'\r\n'):
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            try:
+                return int(value.strip())
+            except ValueError:
+                return None
+    return None
+
+def split_mjpeg_frame(buffer):
+    # Returns (jpeg, rest) for the next complete frame, or (None, buffer) when more
+    # data is needed. The part's Content-Length is used when present. Scanning for
+    # the end marker is only a fallback, since it cuts frames short at the end of an
+    # embedded EXIF thumbnail.
+    begin = buffer.find(JPEG_START)
+    header_end = buffer.find(HEADER_END)
+    if header_end != -1 and (begin == -1 or header_end < begin):
+        length = _content_length(buffer[:header_end])
+        body_start = header_end + len(HEADER_END)
+        if length is not None:
+            if len(buffer) < body_start + length:
+                return None, buffer
+            return buffer[body_start:body_start + length], buffer[body_start + length:]
+
+    if begin == -1:
+        return None, buffer
+    end = buffer.find(JPEG_END, begin + 2)
+    if end == -1:
+        return None, buffer
+    return buffer[begin:end + 2], buffer[end + 2:]
+
+def probe_mjpeg_stream(url):
+    # Read the multipart stream directly, so JPEG sizes and decode cost are measured exactly
+    stats = StreamStats()
+    with urllib.request.urlopen(url, timeout=PROBE_TIMEOUT) as response:
+        stats.connect_latency = time.monotonic() - stats.start
+        buffer = b''
+        while not stats.done():
+            chunk = response.read1(READ_CHUNK_SIZE)
+            # Every frame completed below has its end marker in this chunk
+            received = time.monotonic()
+            if not chunk:
+                break
+            buffer += chunk
+
+            while True:
+                jpeg, buffer = split_mjpeg_frame(buffer)
+                if jpeg is None:
+                    break
+
+                decode_start = time.perf_counter()
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                stats.add_frame(frame, received, len(jpeg), time.perf_counter() - decode_start)
+
+    return stats.result()
+
+def probe_capture_device(url):
+    # Other sources go through OpenCV, so JPEG size and decode cost are estimated by re-encoding
+    stats = StreamStats()
+    cap = cv2.VideoCapture(int(url) if url.isdigit() else url)
+    stats.connect_latency = time.monotonic() - stats.start
+    try:
+        while not stats.done():
+            ret, frame = cap.read()
+            received = time.monotonic()
+            if not ret:
+                if not cap.isOpened():
+                    break
+                time.sleep(0.01)  # Don't spin while other cameras are being probed
+                continue
+            _, jpeg = cv2.imencode('.jpg', frame)
+            decode_start = time.perf_counter()
+            cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+            stats.add_frame(frame, received, len(jpeg), time.perf_counter() - decode_start)
+    finally:
+        cap.release()
+
+    return stats.result()
+
+def probe_camera(url):
+    if url.startswith(('http://', 'https://')):
+        return probe_mjpeg_stream(url)
+    return probe_capture_device(url)
+
+def time_stages(samples, camera_info, detection_types, resolution):
+    camera_info = dict(camera_info, processing_resolution=list(resolution))
+    scale = get_processing_scale(samples[0], camera_info)
+    frames = [prepare_detection_frame(sample, camera_info) for sample in samples]
+    timings = {}
+
+    if 'motion' in detection_types:
+        detector = MotionDetector()
+        detector.detect_motion(frames[0], scale=scale)  # No optical flow on the first frame
+        durations = []
+        for frame in frames[1:]:
+            stage_start = time.perf_counter()
+            detector.detect_motion(frame, threshold=MOTION_THRESHOLD, min_area=MIN_CONTOUR_AREA, scale=scale)
+            durations.append(time.perf_counter() - stage_start)
+        timings['motion'] = statistics.mean(durations)
+
+    if 'person' in detection_types:
+        # Imported here so the setup client only loads the YOLOv5 model when profiling
+        from object_detection import detect_objects
+        detect_objects(frames[0])  # Warm up the model
+        durations = []
+        for frame in frames[1:]:
+            stage_start = time.perf_counter()
+            detect_objects(frame, confidence_threshold=PERSON_CONFIDENCE)
+            durations.append(time.perf_counter() - stage_start)
+        timings['person'] = statistics.mean(durations)
+
+    return timings
+
+def candidate_resolutions(resolution):
+    width, height = resolution
+    resolutions = [resolution]
+    for candidate_width in CANDIDATE_WIDTHS:
+        if candidate_width < width:
+            resolutions.append((candidate_width, round(height * candidate_width / width / 2) * 2))
+    return resolutions
+
+def recommend_settings(profile, stage_timings, camera_count):
+    # Pick the largest resolution whose detections still fit this camera's share of the loop
+    budget = CPU_BUDGET / camera_count
+    max_rate = min(profile['fps'], 1 / PROCESS_INTERVAL)
+
+    resolution, timings = stage_timings[-1]
+    for candidate, candidate_timings in stage_timings:
+        if sum(candidate_timings.values()) * min(TARGET_DETECTION_RATE, max_rate) <= budget:
+            resolution, timings = candidate, candidate_timings
+            break
+
+    cost = sum(timings.values())
+    detection_rate = min(max_rate, budget / cost) if cost else max_rate
+    detection_rate = max(math.floor(detection_rate * 10) / 10, 0.1)
+
+    return {
+        "processing_resolution": list(resolution),
+        "detection_rate": detection_rate
+    }
+
+def profile_camera(camera_info, profile, detection_types, camera_count):
+    stage_timings = [
+        (resolution, time_stages(profile['samples'], camera_info, detection_types, resolution))
+        for resolution in candidate_resolutions(profile['resolution'])
+    ]
+    return stage_timings, recommend_settings(profile, stage_timings, camera_count)
+
+async def profile_cameras(config):
+    # Only cameras used by the logic conditions have detection work to size
+    detections = required_detections(config)
+    detection_types = {}
+    for camera, detection_type in detections:
+        if camera in config['cameras']:
+            detection_types.setdefault(camera, []).append(detection_type)
+    cameras = {name: camera_info for name, camera_info in config['cameras'].items() if name in detection_types}
+    reports = {name: {"skipped": "no conditions use this camera"} for name in config['cameras'] if name not in cameras}
+    if not cameras:
+        return reports
+
+    loop = asyncio.get_event_loop()
+
+    # Probe all streams at once so the measurements reflect a shared network
+    with ThreadPoolExecutor(max_workers=len(cameras)) as executor:
+        profiles = await asyncio.gather(
+            *(loop.run_in_executor(executor, probe_camera, get_camera_url(camera_info)) for camera_info in cameras.values()),
+            return_exceptions=True
+        )
+
+    profiled = {}
+    for name, profile in zip(cameras, profiles):
+        if isinstance(profile, Exception):
+            reports[name] = {"error": str(profile)}
+        else:
+            profiled[name] = profile
+
+    # Time the detection stages one camera at a time, like the processing loop runs them,
+    # sharing the budget between the cameras that will actually run detections
+    for name, profile in profiled.items():
+        camera_info = cameras[name] if isinstance(cameras[name], dict) else {"url": cameras[name]}
+        stage_timings, recommendation = profile_camera(camera_info, profile, detection_types[name], len(profiled))
+        reports[name] = {"profile": profile, "stage_timings": stage_timings, "recommendation": recommendation}
+
+    return {name: reports[name] for name in config['cameras']}
@@ -1,6 +1,12 @@
 import cv2
 import numpy as np
 
+# Frames to allow the background subtractor to stabilize
+WARMUP_FRAMES = 10
+
+# Optical flow magnitude, in native pixels, above which a pixel counts as moving
+FLOW_THRESHOLD = 1  # Adjust this threshold as needed
+
 class MotionDetector:
     def __init__(self):
         self.fgbg = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
@@ -8,7 +14,10 @@ class MotionDetector:
         self.mask = None
         self.frame_count = 0
 
-    def detect_motion(self, frame, threshold=500, min_area=100):
+    def analyze(self, frame, scale=1.0):
+        # Threshold-independent measurements, shared by detect_motion and replay.py.
+        # scale is the processing width over the camera's native width; results are
+        # converted back to native pixels so thresholds keep their meaning after a resize.
         self.frame_count += 1
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         
@@ -29,7 +38,7 @@ class MotionDetector:
         # Create a mask of moving pixels
         if flow is not None:
             magnitude, _ = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-            self.mask = magnitude > 1  # Adjust this threshold as needed
+            self.mask = magnitude > FLOW_THRESHOLD * scale
         else:
             self.mask = np.zeros(gray.shape, dtype=bool)
         
@@ -38,24 +47,24 @@ class MotionDetector:
         
         # Find contours of moving areas
         contours, _ = cv2.findContours(motion_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Filter contours based on area
-        significant_contours = [cnt for cnt in contours if cv2.contourArea(cnt) > min_area]
+        contour_areas = [cv2.contourArea(cnt) / scale ** 2 for cnt in contours]
         
         # Calculate motion score
-        motion_score = np.sum(motion_mask)
+        motion_score = np.sum(motion_mask) / scale ** 2
+        
+        return motion_score, contour_areas
+
+    def detect_motion(self, frame, threshold=500, min_area=100, scale=1.0):
+        motion_score, contour_areas = self.analyze(frame, scale)
+        
+        # Filter contours based on area
+        significant_contours = [area for area in contour_areas if area > min_area]
         
         # Determine if there is significant motion based on threshold
         motion_detected = motion_score > threshold or len(significant_contours) > 0
         
         # Only consider motion after a few frames to allow background subtractor to stabilize
-        if self.frame_count < 10:
+        if self.frame_count < WARMUP_FRAMES:
             motion_detected = False
         
         return motion_detected, motion_score, len(significant_contours)
-
-# Global instance of MotionDetector
-motion_detector = MotionDetector()
-
-def detect_motion(frame, threshold=500, min_area=100):
-    return motion_detector.detect_motion(frame, threshold, min_area)
\ No newline at end of file
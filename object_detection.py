@@ -17,4 +17,12 @@ def detect_objects(frame, confidence_threshold=0.5):
         warnings.simplefilter("ignore", FutureWarning)
         results = model(frame)
     results = results.pandas().xyxy[0]
-    return results[results['confidence'] > confidence_threshold]['name'].tolist()
\ No newline at end of file
+    return results[results['confidence'] > confidence_threshold]['name'].tolist()
+
+def detect_object_confidences(frame):
+    # Highest confidence per class, so thresholds can be applied after the fact
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        results = model(frame)
+    results = results.pandas().xyxy[0]
+    return results.groupby('name')['confidence'].max().to_dict()
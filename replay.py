@@ -0,0 +1,425 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+
+from config_loader import load_config
+from motion_detection import MotionDetector, WARMUP_FRAMES
+from scene_logic import (
+    DEFAULT_PARAMS, PROCESS_INTERVAL,
+    get_camera_url, get_detection_boundaries, get_detection_rate, get_processing_scale,
+    prepare_detection_frame, required_detections, buffer_ratio_met, condition_set_met,
+)
+
+SESSION_FILE = 'session.json'
+INDEX_FILE = 'index.csv'
+CACHE_DIR = 'cache'
+CACHE_VERSION = 2  # Bump when detector outputs change meaning
+JPEG_QUALITY = 95
+
+# Per-process state for sweep workers, set once by the pool initializer
+_sweep_state = {}
+
+def record_camera(camera_name, url, camera_dir, stop_event):
+    cap = cv2.VideoCapture(url)
+    frame_count = 0
+    with open(os.path.join(camera_dir, INDEX_FILE), 'w', newline='') as index_file:
+        writer = csv.writer(index_file)
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            timestamp = time.time()
+            if ret:
+                filename = f"{frame_count:07d}.jpg"
+                cv2.imwrite(os.path.join(camera_dir, filename), frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                writer.writerow([f"{timestamp:.6f}", filename])
+                frame_count += 1
+            else:
+                print(f"[WARNING] Failed to capture frame from camera: {camera_name}")
+                time.sleep(0.01)
+    cap.release()
+    print(f"[DEBUG] Recorded {frame_count} frames from camera: {camera_name}")
+
+def record(config, output_dir, duration=None):
+    if 'cameras' not in config or not config['cameras']:
+        print("No cameras configured. Please run the setup client to add cameras.")
+        return None
+
+    session_dir = os.path.join(output_dir, datetime.now().strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(session_dir)
+
+    # Keep a copy of the config so the recording can be replayed as it was set up
+    with open(os.path.join(session_dir, SESSION_FILE), 'w') as session_file:
+        json.dump({
+            "cameras": config['cameras'],
+            "logic_conditions": config.get('logic_conditions', [])
+        }, session_file, indent=4)
+
+    stop_event = threading.Event()
+    threads = []
+    for name, camera_info in config['cameras'].items():
+        camera_dir = os.path.join(session_dir, name)
+        os.makedirs(camera_dir)
+        thread = threading.Thread(target=record_camera, args=(name, get_camera_url(camera_info), camera_dir, stop_event), daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    print(f"[DEBUG] Recording {len(threads)} cameras to {session_dir}. Press Ctrl+C to stop.")
+    end_time = time.time() + duration if duration else None
+    try:
+        while end_time is None or time.time() < end_time:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+    print(f"[DEBUG] Recording saved to {session_dir}")
+    return session_dir
+
+def load_session(session_dir):
+    with open(os.path.join(session_dir, SESSION_FILE), 'r') as session_file:
+        session = json.load(session_file)
+
+    recorded_frames = {}
+    for name in session['cameras']:
+        with open(os.path.join(session_dir, name, INDEX_FILE), 'r', newline='') as index_file:
+            recorded_frames[name] = [(float(timestamp), filename) for timestamp, filename in csv.reader(index_file)]
+
+    return session, recorded_frames
+
+def build_schedule(recorded_frames, detection_rates=None, interval=PROCESS_INTERVAL):
+    # Mirror the live loop: every interval, each camera hands over its newest
+    # frame if it has a new one, and older unprocessed frames are dropped.
+    # Returns the ticks as (seconds since start, {camera: sample index}) and,
+    # per camera, the recorded frame positions in the order the detectors see them.
+    # A sample index of None means the camera's detection_rate skips this frame
+    # and its last results are reused.
+    detection_rates = detection_rates or {}
+    recorded_frames = {name: frames for name, frames in recorded_frames.items() if frames}
+    if not recorded_frames:
+        return [], {}
+
+    start = min(frames[0][0] for frames in recorded_frames.values())
+    end = max(frames[-1][0] for frames in recorded_frames.values())
+    positions = {name: -1 for name in recorded_frames}
+    last_detection_ticks = {name: -math.inf for name in recorded_frames}
+    # Ticks between detections per camera, counted in integers so float rounding
+    # on epoch timestamps can't skip an extra tick. The live loop detects on the
+    # first tick at least 1 / detection_rate after the last one, hence the ceil.
+    detection_periods = {
+        name: max(1, math.ceil(1 / (rate * interval) - 1e-9))
+        for name, rate in detection_rates.items() if rate
+    }
+    samples = {name: [] for name in recorded_frames}
+    schedule = []
+
+    for tick in range(math.ceil((end - start) / interval) + 1):
+        tick_time = start + tick * interval
+        tick_frames = {}
+        for name, frames in recorded_frames.items():
+            position = positions[name]
+            while position + 1 < len(frames) and frames[position + 1][0] <= tick_time:
+                position += 1
+            if position == positions[name]:
+                continue
+            positions[name] = position
+
+            if name in detection_periods and tick - last_detection_ticks[name] < detection_periods[name]:
+                tick_frames[name] = None
+                continue
+            last_detection_ticks[name] = tick
+            tick_frames[name] = len(samples[name])
+            samples[name].append(position)
+        if tick_frames:
+            schedule.append((tick_time - start, tick_frames))
+
+    return schedule, samples
+
+def run_detector(session_dir, camera, detection_type, filenames, camera_info, threads=None):
+    # Record raw detector outputs so every threshold can be applied afterwards.
+    # threads is this worker's share of the CPU cores, so parallel jobs don't oversubscribe it.
+    if threads:
+        cv2.setNumThreads(threads)
+    if detection_type == 'person':
+        # Imported here so motion-only jobs don't pay for loading the YOLOv5 model
+        import torch
+        from object_detection import detect_object_confidences
+        if threads:
+            torch.set_num_threads(threads)
+    else:
+        detector = MotionDetector()
+
+    outputs = []
+    for filename in filenames:
+        frame = cv2.imread(os.path.join(session_dir, camera, filename))
+        scale = get_processing_scale(frame, camera_info)
+        frame = prepare_detection_frame(frame, camera_info)
+
+        if detection_type == 'person':
+            outputs.append(float(detect_object_confidences(frame).get('person', 0.0)))
+        else:
+            motion_score, contour_areas = detector.analyze(frame, scale)
+            outputs.append([float(motion_score), max(contour_areas, default=0.0), detector.frame_count >= WARMUP_FRAMES])
+
+    print(f"[DEBUG] {detection_type.capitalize()} detection finished for {camera}: {len(outputs)} frames")
+    return outputs
+
+def detector_cache_path(session_dir, camera, detection_type, filenames, camera_info):
+    key = json.dumps({
+        "version": CACHE_VERSION,
+        "frames": filenames,
+        "boundaries": get_detection_boundaries(camera_info),
+        "processing_resolution": camera_info.get('processing_resolution') if isinstance(camera_info, dict) else None
+    }, sort_keys=True)
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(session_dir, camera, CACHE_DIR, f"{detection_type}-{digest}.json")
+
+def load_detector_outputs(session_dir, config, recorded_frames, samples, workers=None):
+    outputs = {}
+    jobs = {}
+    for camera, detection_type in required_detections(config):
+        if camera not in samples:
+            print(f"[WARNING] No recorded frames for camera: {camera}")
+            continue
+
+        filenames = [recorded_frames[camera][position][1] for position in samples[camera]]
+        camera_info = config['cameras'].get(camera)
+        cache_path = detector_cache_path(session_dir, camera, detection_type, filenames, camera_info)
+
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r') as cache_file:
+                outputs[(camera, detection_type)] = json.load(cache_file)
+            print(f"[DEBUG] Using cached {detection_type} detection for {camera}")
+        else:
+            jobs[(camera, detection_type)] = (cache_path, filenames, camera_info)
+
+    if jobs:
+        cpu_count = os.cpu_count() or 1
+        pool_size = min(workers or cpu_count, len(jobs))
+        threads = max(1, cpu_count // pool_size)
+        with ProcessPoolExecutor(max_workers=pool_size) as executor:
+            futures = {
+                key: executor.submit(run_detector, session_dir, key[0], key[1], filenames, camera_info, threads)
+                for key, (cache_path, filenames, camera_info) in jobs.items()
+            }
+            for key, future in futures.items():
+                outputs[key] = future.result()
+                cache_path = jobs[key][0]
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                with open(cache_path, 'w') as cache_file:
+                    json.dump(outputs[key], cache_file)
+
+    return outputs
+
+def detection_active(detection_type, output, params):
+    if detection_type == 'person':
+        return output > params['person_confidence']
+    motion_score, max_contour_area, warmed_up = output
+    return warmed_up and (motion_score > params['motion_threshold'] or max_contour_area > params['min_contour_area'])
+
+def simulate(config, schedule, outputs, params):
+    buffers = {key: deque(maxlen=params['buffer_size']) for key in outputs}
+    buffer_ratios = {'motion': params['motion_buffer_ratio'], 'person': params['person_buffer_ratio']}
+    last_scene_change_time = -params['scene_change_cooldown']
+    current_scene = None
+    # Results are kept between ticks, so cameras skipped by their detection_rate reuse them
+    detection_results = {}
+    timeline = []
+
+    for tick_time, tick_frames in schedule:
+        if tick_time - last_scene_change_time < params['scene_change_cooldown']:
+            continue  # Skip evaluation if we're still in the cooldown period
+
+        for (camera, detection_type), camera_outputs in outputs.items():
+            if camera in tick_frames and tick_frames[camera] is not None:
+                buffer = buffers[(camera, detection_type)]
+                buffer.append(detection_active(detection_type, camera_outputs[tick_frames[camera]], params))
+                detection_results[f"{camera}_{detection_type}"] = buffer_ratio_met(buffer, buffer_ratios[detection_type])
+
+        for i, condition_set in enumerate(config['logic_conditions'], 1):
+            if condition_set_met(condition_set, tick_frames, detection_results):
+                if condition_set['scene'] != current_scene:
+                    current_scene = condition_set['scene']
+                    timeline.append({"time": round(tick_time, 3), "scene": current_scene, "condition_set": i})
+                    last_scene_change_time = tick_time
+                break
+
+    return timeline
+
+def summarize(timeline, duration):
+    scene_time = {}
+    for entry, next_entry in zip(timeline, timeline[1:] + [None]):
+        end = next_entry['time'] if next_entry else duration
+        scene_time[entry['scene']] = scene_time.get(entry['scene'], 0) + end - entry['time']
+    return {
+        "switches": len(timeline),
+        "scene_time": {scene: round(seconds, 3) for scene, seconds in scene_time.items()}
+    }
+
+def _init_sweep_worker(config, schedule, outputs):
+    _sweep_state.update(config=config, schedule=schedule, outputs=outputs)
+
+def _run_sweep_point(params):
+    return simulate(_sweep_state['config'], _sweep_state['schedule'], _sweep_state['outputs'], params)
+
+def prepare_replay(session_dir, config_path=None, interval=PROCESS_INTERVAL, workers=None):
+    session, recorded_frames = load_session(session_dir)
+    config = load_config(config_path) if config_path else session
+
+    if 'logic_conditions' not in config or not config['logic_conditions']:
+        print("No logic conditions configured. Please run the setup client to add conditions.")
+        return None
+
+    detection_rates = {name: get_detection_rate(camera_info) for name, camera_info in config['cameras'].items()}
+    schedule, samples = build_schedule(recorded_frames, detection_rates, interval)
+    outputs = load_detector_outputs(session_dir, config, recorded_frames, samples, workers)
+    return config, schedule, outputs
+
+def replay(session_dir, params, config_path=None, interval=PROCESS_INTERVAL, workers=None):
+    prepared = prepare_replay(session_dir, config_path, interval, workers)
+    if prepared is None:
+        return None
+    config, schedule, outputs = prepared
+
+    timeline = simulate(config, schedule, outputs, params)
+    duration = schedule[-1][0] if schedule else 0
+    return {"params": params, "timeline": timeline, "summary": summarize(timeline, duration)}
+
+def sweep(session_dir, base_params, variations, config_path=None, interval=PROCESS_INTERVAL, workers=None):
+    prepared = prepare_replay(session_dir, config_path, interval, workers)
+    if prepared is None:
+        return None
+    config, schedule, outputs = prepared
+
+    names = [name for name, _ in variations]
+    points = [
+        dict(base_params, **dict(zip(names, values)))
+        for values in itertools.product(*(values for _, values in variations))
+    ]
+    print(f"[DEBUG] Evaluating {len(points)} sweep points over {len(schedule)} ticks")
+
+    duration = schedule[-1][0] if schedule else 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker, initargs=(config, schedule, outputs)) as executor:
+        timelines = list(executor.map(_run_sweep_point, points, chunksize=max(1, len(points) // 32)))
+
+    return [
+        {"params": params, "timeline": timeline, "summary": summarize(timeline, duration)}
+        for params, timeline in zip(points, timelines)
+    ]
+
+def _param_type(name):
+    if name not in DEFAULT_PARAMS:
+        raise argparse.ArgumentTypeError(f"Unknown parameter '{name}'. Choose from: {', '.join(DEFAULT_PARAMS)}")
+    return int if name == 'buffer_size' else float
+
+def _parse_param_value(name, value):
+    try:
+        value = _param_type(name)(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid value for '{name}': {value}")
+
+    # Reject values that would crash a replay (or a single sweep worker, aborting the whole sweep)
+    if name == 'buffer_size' and value < 1:
+        raise argparse.ArgumentTypeError(f"'{name}' must be at least 1, got {value}")
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"'{name}' must not be negative, got {value}")
+    return value
+
+def positive_float(value):
+    try:
+        value = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid number: {value}")
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+    return value
+
+def positive_int(value):
+    try:
+        value = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid integer: {value}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def parse_setting(setting):
+    name, _, value = setting.partition('=')
+    return name, _parse_param_value(name, value)
+
+def parse_variation(variation):
+    name, _, values = variation.partition('=')
+    return name, [_parse_param_value(name, value) for value in values.split(',')]
+
+def print_timeline(result):
+    for entry in result['timeline']:
+        print(f"[{entry['time']:10.3f}] Switch to scene '{entry['scene']}' (condition set {entry['condition_set']})")
+    print_summary(result)
+
+def print_summary(result):
+    varied = ', '.join(f"{name}={value}" for name, value in result['params'].items() if value != DEFAULT_PARAMS[name])
+    scene_time = ', '.join(f"{scene}: {seconds:.1f}s" for scene, seconds in result['summary']['scene_time'].items())
+    print(f"[{varied or 'defaults'}] {result['summary']['switches']} switches | {scene_time or 'no scene selected'}")
+
+def write_output(path, data):
+    with open(path, 'w') as output_file:
+        json.dump(data, output_file, indent=4)
+    print(f"Results written to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record camera streams and replay them through the scene switching logic.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="Save timestamped frames from every configured camera")
+    record_parser.add_argument('--config', default='obs_config.json', help="Config file with the cameras to record")
+    record_parser.add_argument('--output', default='recordings', help="Directory to store recordings in")
+    record_parser.add_argument('--duration', type=float, help="Seconds to record (default: until Ctrl+C)")
+
+    replay_parser = subparsers.add_parser('replay', help="Run a recording through the detectors and print the scene timeline")
+    sweep_parser = subparsers.add_parser('sweep', help="Replay a recording against every combination of parameter values")
+    for subparser in (replay_parser, sweep_parser):
+        subparser.add_argument('session', help="Recording directory created by the record command")
+        subparser.add_argument('--config', help="Use cameras and conditions from this config instead of the recorded ones")
+        subparser.add_argument('--set', dest='settings', type=parse_setting, action='append', default=[], metavar='NAME=VALUE', help="Override a parameter")
+        subparser.add_argument('--interval', type=positive_float, default=PROCESS_INTERVAL, help="Seconds between evaluations (default: %(default)s)")
+        subparser.add_argument('--workers', type=positive_int, help="Worker processes (default: CPU count)")
+        subparser.add_argument('--output', help="Write the results as JSON to this file")
+    sweep_parser.add_argument('--vary', dest='variations', type=parse_variation, action='append', required=True, metavar='NAME=V1,V2,...', help="Values to sweep for a parameter")
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(load_config(args.config), args.output, args.duration)
+        return
+
+    params = dict(DEFAULT_PARAMS, **dict(args.settings))
+
+    if args.command == 'replay':
+        result = replay(args.session, params, args.config, args.interval, args.workers)
+        if result is None:
+            return
+        print_timeline(result)
+    else:
+        result = sweep(args.session, params, args.variations, args.config, args.interval, args.workers)
+        if result is None:
+            return
+        for point in result:
+            print_summary(point)
+
+    if args.output:
+        write_output(args.output, result)
+
+if __name__ == '__main__':
+    main()
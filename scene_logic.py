@@ -0,0 +1,98 @@
+import cv2
+
+# Motion detection thresholds
+MOTION_THRESHOLD = 10000  # Adjust this value based on testing
+MIN_CONTOUR_AREA = 100  # Adjust this value based on testing
+
+# Person detection confidence
+PERSON_CONFIDENCE = 0.6
+
+# Buffers to smooth out detections: a detection is active when more than
+# this fraction of the buffered results are positive
+DETECTION_BUFFER_SIZE = 10
+MOTION_BUFFER_RATIO = 0.5
+PERSON_BUFFER_RATIO = 0.5
+
+SCENE_CHANGE_COOLDOWN = 1  # 1 second cooldown
+
+# Main loop interval, also used by replay.py to sample recorded frames
+PROCESS_INTERVAL = 0.1  # Check every 100ms
+
+# Defaults used by replay.py, keyed by the names accepted on its command line
+DEFAULT_PARAMS = {
+    'motion_threshold': MOTION_THRESHOLD,
+    'min_contour_area': MIN_CONTOUR_AREA,
+    'person_confidence': PERSON_CONFIDENCE,
+    'buffer_size': DETECTION_BUFFER_SIZE,
+    'motion_buffer_ratio': MOTION_BUFFER_RATIO,
+    'person_buffer_ratio': PERSON_BUFFER_RATIO,
+    'scene_change_cooldown': SCENE_CHANGE_COOLDOWN,
+}
+
+def apply_detection_boundaries(frame, boundaries):
+    height, width = frame.shape[:2]
+    left = int(boundaries['left'] * width / 100)
+    top = int(boundaries['top'] * height / 100)
+    right = int(boundaries['right'] * width / 100)
+    bottom = int(boundaries['bottom'] * height / 100)
+    return frame[top:bottom, left:right]
+
+def get_camera_url(camera_info):
+    return camera_info['url'] if isinstance(camera_info, dict) else camera_info
+
+def get_detection_boundaries(camera_info):
+    return camera_info.get('detection_boundaries') if isinstance(camera_info, dict) else None
+
+def get_detection_rate(camera_info):
+    # Detections per second, recommended by the camera profiler in setup_client.py
+    return camera_info.get('detection_rate') if isinstance(camera_info, dict) else None
+
+def get_processing_scale(frame, camera_info):
+    # Processing width over native width, used to keep motion thresholds in native pixels
+    resolution = camera_info.get('processing_resolution') if isinstance(camera_info, dict) else None
+    return resolution[0] / frame.shape[1] if resolution else 1.0
+
+def prepare_detection_frame(frame, camera_info):
+    resolution = camera_info.get('processing_resolution') if isinstance(camera_info, dict) else None
+    if resolution and tuple(resolution) != (frame.shape[1], frame.shape[0]):
+        frame = cv2.resize(frame, tuple(resolution), interpolation=cv2.INTER_AREA)
+
+    boundaries = get_detection_boundaries(camera_info)
+    if boundaries:
+        frame = apply_detection_boundaries(frame, boundaries)
+    return frame
+
+def required_detections(config):
+    # Unique (camera, detection_type) pairs used by the logic conditions, in order
+    detections = []
+    for condition_set in config.get('logic_conditions', []):
+        for condition in condition_set['conditions']:
+            key = (condition['camera'], condition['detection_type'])
+            if key not in detections:
+                detections.append(key)
+    return detections
+
+def buffer_ratio_met(buffer, ratio):
+    return sum(buffer) / len(buffer) > ratio
+
+def condition_set_met(condition_set, frames, detection_results):
+    for condition in condition_set['conditions']:
+        camera = condition['camera']
+        detection_type = condition['detection_type']
+        condition_type = condition['condition_type']
+
+        if camera not in frames:
+            return False
+
+        detection_key = f"{camera}_{detection_type}"
+        detection_result = detection_results.get(detection_key, False)
+
+        condition_met = (
+            (condition_type == 'presence' and detection_result) or
+            (condition_type == 'absence' and not detection_result)
+        )
+
+        if not condition_met:
+            return False
+
+    return True
@@ -1,6 +1,7 @@
 import asyncio
 import json
 from obs_connection import OBSConnection
+from camera_profiler import profile_cameras, PROBE_DURATION
 import cv2
 import numpy as np
 
@@ -36,6 +37,9 @@ class SetupClient:
         self.display_scenes(scenes)
         await self.manage_cameras()
         await self.manage_conditions(scenes)
+        if self.config['cameras'] and self.config['logic_conditions']:
+            if input("\nProfile cameras now to size processing settings? (y/n): ").lower() == 'y':
+                await self.profile_cameras()
         await self.obs.disconnect()
         self.save_config()
 
@@ -54,7 +58,8 @@ class SetupClient:
             print("2. Remove camera")
             print("3. List cameras")
             print("4. Add/Update detection boundaries")
-            print("5. Return to Main Menu")
+            print("5. Profile cameras")
+            print("6. Return to Main Menu")
             choice = input("Enter your choice: ")
 
             if choice == '1':
@@ -73,6 +78,8 @@ class SetupClient:
             elif choice == '4':
                 await self.add_detection_boundaries()
             elif choice == '5':
+                await self.profile_cameras()
+            elif choice == '6':
                 break
             else:
                 print("Invalid choice. Please try again.")
@@ -87,6 +94,9 @@ class SetupClient:
                     print(f"  Detection Boundaries: {camera_info['detection_boundaries']}")
                 else:
                     print("  No detection boundaries set")
+                if 'processing_resolution' in camera_info:
+                    width, height = camera_info['processing_resolution']
+                    print(f"  Processing: {width}x{height} at {camera_info.get('detection_rate')} detections/s")
             else:
                 print(f"  URL: {camera_info}")
                 print("  No detection boundaries set")
@@ -183,6 +193,47 @@ class SetupClient:
 
         cv2.destroyAllWindows()
 
+    async def profile_cameras(self):
+        if not self.config['cameras']:
+            print("No cameras configured. Please add a camera first.")
+            return
+        if not self.config['logic_conditions']:
+            print("Profiling sizes the detections your conditions run, so conditions must be configured first.")
+            print("Add them in Condition Management; you will be offered profiling at the end of setup.")
+            return
+
+        print(f"\nProbing the cameras used by conditions for {PROBE_DURATION} seconds...")
+        reports = await profile_cameras(self.config)
+
+        for name, report in reports.items():
+            print(f"\n{name}:")
+            if 'skipped' in report:
+                print(f"  Skipped: {report['skipped']}")
+                continue
+            if 'error' in report:
+                print(f"  Failed to profile camera: {report['error']}")
+                continue
+
+            profile = report['profile']
+            width, height = profile['resolution']
+            print(f"  Resolution: {width}x{height} at {profile['fps']:.1f} fps")
+            print(f"  JPEG size: {profile['jpeg_size'] / 1024:.1f} KB, decode: {profile['decode_time'] * 1000:.1f} ms")
+            print(f"  Connection latency: {profile['connect_latency'] * 1000:.0f} ms, first frame: {profile['first_frame_latency'] * 1000:.0f} ms")
+            print(f"  Jitter: {profile['jitter'] * 1000:.1f} ms")
+            for (stage_width, stage_height), timings in report['stage_timings']:
+                stages = ', '.join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in timings.items())
+                print(f"  At {stage_width}x{stage_height}: {stages}")
+
+            recommendation = report['recommendation']
+            width, height = recommendation['processing_resolution']
+            print(f"  Recommended: {width}x{height} at {recommendation['detection_rate']} detections/s")
+
+            if isinstance(self.config['cameras'][name], str):
+                self.config['cameras'][name] = {"url": self.config['cameras'][name]}
+            self.config['cameras'][name].update(recommendation)
+
+        self.save_config()
+
     async def manage_conditions(self, scenes):
         while True:
             print("\nCondition Management:")